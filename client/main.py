@@ -1,26 +1,50 @@
 import asyncio
 import aiohttp
+import numpy as np
 import time
 from datetime import datetime
 from typing import List
 import argparse
+import socket
 import sys
+from yarl import URL
+
+
+# Shared per-request timeout, built once rather than on every call
+_PER_REQ_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+# Socket buffer size for benchmark connections
+_SOCKET_BUFFER_SIZE = 1 << 20
+
+
+def _make_socket(addr_info) -> socket.socket:
+    """Create a client socket with larger kernel buffers"""
+    family, type_, proto, _, _ = addr_info
+    sock = socket.socket(family=family, type=type_, proto=proto)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCKET_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCKET_BUFFER_SIZE)
+    except OSError:
+        sock.close()
+        raise
+    return sock
 
 
 class PerformanceStats:
     """Track and calculate performance statistics"""
     
-    def __init__(self):
+    def __init__(self, capacity: int):
+        self.capacity = capacity
         self.reset()
     
     def reset(self):
-        self.total_requests = 0
-        self.successful_requests = 0
-        self.failed_requests = 0
         self.total_time = 0.0
         self.start_time = None
         self.end_time = None
-        self.response_times = []
+        # Preallocated buffers written by request index; a slot that is never
+        # recorded counts as a failed request with a zero response time
+        self._times = np.zeros(self.capacity, dtype=np.float32)
+        self._ok = np.zeros(self.capacity, dtype=np.bool_)
     
     def start_timing(self):
         self.start_time = time.perf_counter()
@@ -29,52 +53,54 @@ class PerformanceStats:
         self.end_time = time.perf_counter()
         self.total_time = self.end_time - self.start_time
     
-    def add_request(self, response_time: float, success: bool = True):
-        self.total_requests += 1
-        self.response_times.append(response_time)
-        if success:
-            self.successful_requests += 1
-        else:
-            self.failed_requests += 1
+    def record(self, index: int, response_time: float, success: bool = True):
+        self._times[index] = response_time
+        self._ok[index] = success
     
     def get_stats(self):
-        if not self.response_times:
+        if self.capacity == 0:
             return {}
         
-        sorted_times = sorted(self.response_times)
-        count = len(sorted_times)
+        times = self._times
+        count = self.capacity
+        successful = int(self._ok.sum())
+        
+        # Partial selection is O(n) versus a full sort for the percentiles
+        p50, p95, p99 = count // 2, int(count * 0.95), int(count * 0.99)
+        partitioned = np.partition(times, [p50, p95, p99])
         
         return {
-            'total_requests': self.total_requests,
-            'successful_requests': self.successful_requests,
-            'failed_requests': self.failed_requests,
+            'total_requests': count,
+            'successful_requests': successful,
+            'failed_requests': count - successful,
             'total_time': self.total_time,
-            'requests_per_second': self.successful_requests / self.total_time if self.total_time > 0 else 0,
-            'avg_response_time': sum(sorted_times) / count,
-            'min_response_time': sorted_times[0],
-            'max_response_time': sorted_times[-1],
-            'p50_response_time': sorted_times[count // 2],
-            'p95_response_time': sorted_times[int(count * 0.95)],
-            'p99_response_time': sorted_times[int(count * 0.99)],
+            'requests_per_second': successful / self.total_time if self.total_time > 0 else 0,
+            'avg_response_time': float(times.sum(dtype=np.float64)) / count,
+            'min_response_time': float(times.min()),
+            'max_response_time': float(times.max()),
+            'p50_response_time': float(partitioned[p50]),
+            'p95_response_time': float(partitioned[p95]),
+            'p99_response_time': float(partitioned[p99]),
         }
 
 
-async def fetch_single_request(session: aiohttp.ClientSession, url: str, semaphore: asyncio.Semaphore) -> tuple[float, bool]:
+async def fetch_single_request(session: aiohttp.ClientSession, url: URL) -> tuple[float, bool]:
     """Make a single HTTP request with connection reuse and proper error handling"""
-    async with semaphore:  # Limit concurrent connections
-        start_time = time.perf_counter()
-        try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                await response.read()  # Ensure we read the full response
+    start_time = time.perf_counter()
+    try:
+        async with session.get(url, timeout=_PER_REQ_TIMEOUT) as response:
+            if response.status != 200:
                 end_time = time.perf_counter()
-                success = response.status == 200
-                if not success:
-                    print(f"Error: Received status code {response.status}")
-                return end_time - start_time, success
-        except Exception as e:
+                print(f"Error: Received status code {response.status}")
+                return end_time - start_time, False
+            
+            await response.read()  # Drain the body so the connection is kept alive for reuse
             end_time = time.perf_counter()
-            print(f"Request failed: {e}")
-            return end_time - start_time, False
+            return end_time - start_time, True
+    except Exception as e:
+        end_time = time.perf_counter()
+        print(f"Request failed: {e}")
+        return end_time - start_time, False
 
 
 async def run_benchmark(
@@ -82,10 +108,15 @@ async def run_benchmark(
     total_requests: int = 50000,
     concurrent_requests: int = 500,
     connection_pool_size: int = 250,
-    show_progress: bool = True
+    show_progress: bool = True,
+    warmup_requests: int = 0
 ) -> PerformanceStats:
     """Run the main benchmark with optimized async requests"""
     
+    # A pool smaller than the concurrency leaves workers blocked waiting for
+    # a connection, so never size it below the number of concurrent requests
+    connection_pool_size = max(connection_pool_size, concurrent_requests)
+    
     print("🚀 Starting optimized HTTP benchmark")
     print(f"📊 Configuration:")
     print(f"   - Target URL: {url}")
@@ -94,22 +125,24 @@ async def run_benchmark(
     print(f"   - Connection pool size: {connection_pool_size}")
     print("=" * 70)
     
-    # Create semaphore to limit concurrent connections
-    semaphore = asyncio.Semaphore(concurrent_requests)
+    # Parse the URL once instead of on every session.get call
+    target = URL(url)
     
-    # Configure connection pool for optimal performance
+    # Configure connection pool for optimal performance; a single host is
+    # targeted, so the per-host limit matches the total pool size
     connector = aiohttp.TCPConnector(
         limit=connection_pool_size,  # Total connection pool size
         limit_per_host=connection_pool_size,  # Connections per host
         keepalive_timeout=60,  # Keep connections alive for 60 seconds
         enable_cleanup_closed=True,  # Clean up closed connections
         use_dns_cache=True,  # Cache DNS lookups
+        socket_factory=_make_socket,  # Larger socket buffers
     )
     
     # Configure session with optimizations
     timeout = aiohttp.ClientTimeout(total=10, connect=5)
     
-    stats = PerformanceStats()
+    stats = PerformanceStats(total_requests)
     
     async with aiohttp.ClientSession(
         connector=connector,
@@ -117,34 +150,45 @@ async def run_benchmark(
         headers={'Connection': 'keep-alive'},  # Reuse connections
     ) as session:
         
-        # Create all request tasks
-        tasks = []
-        stats.start_timing()
+        # Warm up on the benchmark session so measurement starts with open
+        # connections already in the pool
+        if warmup_requests > 0:
+            await warmup_server(session, target, warmup_requests)
         
+        # A fixed pool of workers pulls request indices from a queue, so the
+        # number of live tasks stays at the configured concurrency
+        queue = asyncio.Queue()
         for i in range(total_requests):
-            task = fetch_single_request(session, url, semaphore)
-            tasks.append(task)
+            queue.put_nowait(i)
         
-        # Execute all requests concurrently with progress tracking
         completed = 0
-        batch_size = min(1000, concurrent_requests * 2)  # Process in batches for memory efficiency
+        report_step = max(1, total_requests // 20)
+        next_report = report_step
+        stats.start_timing()
         
-        for i in range(0, len(tasks), batch_size):
-            batch = tasks[i:i + batch_size]
-            results = await asyncio.gather(*batch, return_exceptions=True)
-            
-            for result in results:
-                if isinstance(result, Exception):
-                    stats.add_request(0.0, False)
-                else:
-                    response_time, success = result
-                    stats.add_request(response_time, success)
+        async def worker():
+            nonlocal completed, next_report
+            while True:
+                index = await queue.get()
+                try:
+                    response_time, success = await fetch_single_request(session, target)
+                    stats.record(index, response_time, success)
+                finally:
+                    queue.task_done()
                 
                 completed += 1
                 
-                if show_progress and completed % max(1, total_requests // 20) == 0:
+                if show_progress and completed >= next_report:
                     progress = (completed / total_requests) * 100
                     print(f"Progress: {progress:.1f}% ({completed:,}/{total_requests:,})")
+                    next_report += report_step
+        
+        workers = [asyncio.create_task(worker()) for _ in range(concurrent_requests)]
+        await queue.join()
+        
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
         
         stats.end_timing()
     
@@ -190,19 +234,15 @@ def print_results(stats: PerformanceStats):
     print("=" * 70)
 
 
-async def warmup_server(url: str, warmup_requests: int = 100):
-    """Warm up the server with a few requests"""
+async def warmup_server(session: aiohttp.ClientSession, url: URL, warmup_requests: int = 100):
+    """Warm up the server and the session's connection pool with a few requests"""
     print(f"🔥 Warming up server with {warmup_requests} requests...")
     
-    connector = aiohttp.TCPConnector(limit=20)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        tasks = []
-        semaphore = asyncio.Semaphore(10)  # Lower concurrency for warmup
-        
-        for _ in range(warmup_requests):
-            tasks.append(fetch_single_request(session, url, semaphore))
-        
-        await asyncio.gather(*tasks, return_exceptions=True)
+    tasks = []
+    for _ in range(warmup_requests):
+        tasks.append(fetch_single_request(session, url))
+    
+    await asyncio.gather(*tasks, return_exceptions=True)
     
     print("✅ Warmup complete!")
 
@@ -213,7 +253,7 @@ async def main():
     parser.add_argument('--url', default='http://localhost:8000/ping', help='Target URL')
     parser.add_argument('--requests', type=int, default=10000, help='Total number of requests')
     parser.add_argument('--concurrency', type=int, default=100, help='Number of concurrent requests')
-    parser.add_argument('--pool-size', type=int, default=100, help='Connection pool size')
+    parser.add_argument('--pool-size', type=int, default=100, help='Connection pool size (raised to --concurrency if smaller)')
     parser.add_argument('--no-warmup', action='store_true', help='Skip server warmup')
     parser.add_argument('--no-progress', action='store_true', help='Hide progress output')
     
@@ -223,24 +263,21 @@ async def main():
         # Test server connectivity first
         connector = aiohttp.TCPConnector()
         async with aiohttp.ClientSession(connector=connector) as session:
-            async with session.get(args.url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            async with session.get(args.url, timeout=_PER_REQ_TIMEOUT) as response:
                 if response.status != 200:
                     print(f"❌ Server returned status {response.status}")
                     sys.exit(1)
         
         print(f"✅ Server is responding at {args.url}")
         
-        # Optional warmup
-        if not args.no_warmup:
-            await warmup_server(args.url, min(100, args.requests // 10))
-        
         # Run the main benchmark
         stats = await run_benchmark(
             url=args.url,
             total_requests=args.requests,
             concurrent_requests=args.concurrency,
             connection_pool_size=args.pool_size,
-            show_progress=not args.no_progress
+            show_progress=not args.no_progress,
+            warmup_requests=0 if args.no_warmup else min(100, args.requests // 10),
         )
         
         # Print results
@@ -259,4 +296,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # Faster event loop so the client is not the bottleneck
+    except ImportError:
+        asyncio.run(main())
+    else:
+        asyncio.run(main(), loop_factory=uvloop.new_event_loop)
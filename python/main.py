@@ -1,3 +1,5 @@
+import os
+
 import uvicorn
 
 if __name__ == "__main__":
@@ -10,7 +12,8 @@ if __name__ == "__main__":
         "server:app",
         host="0.0.0.0",
         port=8000,
-        workers=6,
+        workers=os.cpu_count() or 1,  # One worker per core
+        backlog=4096,  # Deeper accept queue for connection bursts
         loop="uvloop",  # Use uvloop for better performance (if available)
         http="httptools",  # Use httptools for faster HTTP parsing
     )
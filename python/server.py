@@ -1,54 +1,91 @@
+import asyncio
+import contextlib
+import orjson
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 from starlette.routing import Route
 from datetime import datetime, timezone
 
 
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson instead of the stdlib json module"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+# The root body is static, so serialize it once at import time
+_ROOT_BYTES = orjson.dumps(
+    {
+        "message": "Welcome to the Ping-Pong Server Starlette!",
+        "endpoints": {
+            "ping": "/ping",
+            "health": "/health",
+        },
+    }
+)
+
+
+def _ping_bytes(timestamp: str) -> bytes:
+    """Serialize the ping payload for the given timestamp"""
+    return orjson.dumps({"message": "pong", "timestamp": timestamp, "success": True})
+
+
+# Timestamp and ping body served by the handlers, refreshed once per second by _tick()
+_now_iso = datetime.now(timezone.utc).isoformat()
+_ping_body = _ping_bytes(_now_iso)
+
+
+async def _tick():
+    """Refresh the cached timestamp so handlers avoid a clock read per request"""
+    global _now_iso, _ping_body
+    while True:
+        _now_iso = datetime.now(timezone.utc).isoformat()
+        _ping_body = _ping_bytes(_now_iso)
+        await asyncio.sleep(1)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Run the timestamp ticker for the lifetime of the application"""
+    task = asyncio.create_task(_tick())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
 async def ping(request):
     """Handle ping requests - return pong with timestamp"""
-    print("Handled ping request")
-    response_data = {
-        "message": "pong",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "success": True,
-    }
-    return JSONResponse(response_data)
+    return Response(_ping_body, media_type="application/json")
 
 
 async def health(request):
     """Handle health check requests"""
-    print("Handled health check request")
     response_data = {
         "status": "healthy",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _now_iso,
     }
-    return JSONResponse(response_data)
+    return ORJSONResponse(response_data)
 
 
 async def root(request):
     """Handle root requests - return welcome message and available endpoints"""
-    print("Handled root request")
-    response_data = {
-        "message": "Welcome to the Ping-Pong Server Starlette!",
-        "endpoints": {
-            "ping": "/ping",
-            "health": "/health",
-        },
-    }
-    return JSONResponse(response_data)
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 
 async def not_found(request, exc):
     """Handle 404 requests"""
-    print(f"Handled 404 request for path: {request.url.path}")
     response_data = {
         "message": "Not Found",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _now_iso,
         "success": False,
     }
-    return JSONResponse(response_data, status_code=404)
+    return ORJSONResponse(response_data, status_code=404)
 
 
 # Define routes
@@ -75,4 +112,5 @@ app = Starlette(
     routes=routes,
     middleware=middleware,
     exception_handlers={404: not_found},
+    lifespan=lifespan,
 )